@@ -12,11 +12,14 @@ BIN_merge.py --explode --no-merge --types GPS 000011.BIN
 """
 
 import argparse
+import contextlib
+import io
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-import pandas as pd
 from pymavlink import mavutil
 
 import util
+from column_buffer import ColumnBuffer
 from log_merger import LogMerger
 
 # Basically everything I've seen in an ArduSub dataflash (BIN) file
@@ -163,15 +166,15 @@ class DataflashTable:
 
     def __init__(self, msg_type: str):
         self._msg_type = msg_type
-        self._rows = []
+        self._columns = ColumnBuffer()
         self._df = None
 
     def append(self, row: dict):
-        self._rows.append(row)
+        self._columns.append(row)
 
     def get_dataframe(self, verbose):
         if self._df is None:
-            self._df = pd.DataFrame(self._rows)
+            self._df = self._columns.to_dataframe()
             if verbose:
                 print('-----------------')
                 if self._df.empty:
@@ -368,6 +371,25 @@ class DataflashLogReader(LogMerger):
         print(f'{msg_count} messages')
 
 
+def process_file(file: str, msg_types: list[str], args):
+    print('===================')
+    reader = DataflashLogReader(file, msg_types, args.max_msgs, args.max_rows, args.verbose, args.raw, args.start,
+                                args.stop)
+    reader.read()
+    if args.explode:
+        reader.write_msg_csv_files()
+    if not args.no_merge:
+        reader.write_merged_csv_file()
+
+
+def process_file_buffered(file: str, msg_types: list[str], args) -> str:
+    """Run process_file in a worker process, and return the output so that it can be printed in one block"""
+    with io.StringIO() as buffer:
+        with contextlib.redirect_stdout(buffer):
+            process_file(file, msg_types, args)
+        return buffer.getvalue()
+
+
 def main():
     parser = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter, description=__doc__)
     parser.add_argument('-r', '--recurse', action='store_true',
@@ -392,6 +414,8 @@ def main():
                         help='hack: segment start')
     parser.add_argument('--stop', type=float, default=-1.0,
                         help='hack: segment stop')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='process this many files in parallel (default 1)')
     parser.add_argument('path', nargs='+')
     args = parser.parse_args()
     files = util.expand_path(args.path, args.recurse, '.BIN')
@@ -405,14 +429,16 @@ def main():
         msg_types = SURFTRAK_MSG_TYPES
     print(f'Looking for {len(msg_types)} types: {msg_types}')
 
-    for file in files:
-        print('===================')
-        reader = DataflashLogReader(file, msg_types, args.max_msgs, args.max_rows, args.verbose, args.raw, args.start, args.stop)
-        reader.read()
-        if args.explode:
-            reader.write_msg_csv_files()
-        if not args.no_merge:
-            reader.write_merged_csv_file()
+    if args.jobs > 1 and len(files) > 1:
+        # The files are independent, so process them in separate processes
+        # Print the output for each file when it is done, rather than interleaving the output for all files
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(files))) as executor:
+            futures = [executor.submit(process_file_buffered, file, msg_types, args) for file in files]
+            for future in as_completed(futures):
+                print(future.result(), end='')
+    else:
+        for file in files:
+            process_file(file, msg_types, args)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,91 @@
+import math
+from array import array
+
+import numpy as np
+import pandas as pd
+
+
+def new_column(value, num_rows: int, typecode: str | None = None) -> array | list:
+    """
+    Return an empty column for this value. Ints and floats are stored in typed arrays, which hold raw 8-byte values
+    rather than Python objects. Everything else (strings, None, ...) is stored in a list.
+
+    The caller may pick a narrower typecode for an int column, e.g., 'H' for uint16 fields.
+
+    If the column starts after row 0 then the earlier rows are missing. A float column marks these with NaN, which is
+    what pandas would do anyway; other columns fill them with None, which requires a list.
+    """
+    if type(value) is float:
+        return array('d', [math.nan]) * num_rows
+    if num_rows == 0:
+        if typecode is not None and type(value) is int:
+            return array(typecode)
+        if type(value) is int:
+            return array('q')
+    return [None] * num_rows
+
+
+class ColumnBuffer:
+    """
+    Accumulate rows (dicts) as columns.
+
+    A log may contain millions of messages of a single type. Storing each message as a dict costs a few hundred bytes,
+    and building a DataFrame from a list of dicts hashes every key of every row. Storing the values by column avoids
+    both of these costs.
+    """
+    __slots__ = ('_columns', '_num_rows', '_typecodes')
+
+    def __init__(self, typecodes: dict[str, str] | None = None):
+        self._columns: dict[str, array | list] = {}
+        self._num_rows = 0
+        self._typecodes = typecodes or {}
+
+    def append(self, row: dict):
+        columns = self._columns
+        num_rows = self._num_rows
+        added = False
+
+        for key, value in row.items():
+            column = columns.get(key)
+            if column is None:
+                column = columns[key] = new_column(value, num_rows, self._typecodes.get(key))
+                added = True
+
+            try:
+                column.append(value)
+            except (TypeError, OverflowError):
+                if value is None and column.typecode == 'd':
+                    column.append(math.nan)
+                else:
+                    # The value doesn't fit in the typed array, e.g., None or a very large int, so fall back to a list
+                    column = columns[key] = column.tolist()
+                    column.append(value)
+
+        self._num_rows = num_rows + 1
+
+        # Fill in any columns that this row didn't have
+        if added or len(row) < len(columns):
+            for key, column in columns.items():
+                if len(column) == num_rows:
+                    if isinstance(column, array):
+                        if column.typecode == 'd':
+                            column.append(math.nan)
+                            continue
+                        column = columns[key] = column.tolist()
+                    column.append(None)
+
+    def column(self, key: str) -> array | list:
+        return self._columns[key]
+
+    def set_column(self, key: str, values: array | list | np.ndarray):
+        """Add or replace a column, there must be one value per row"""
+        assert len(values) == self._num_rows
+        self._columns[key] = values
+
+    def to_dataframe(self) -> pd.DataFrame:
+        # np.frombuffer does not copy, the DataFrame constructor makes a single copy of each typed column
+        return pd.DataFrame({key: np.frombuffer(column, dtype=column.typecode) if isinstance(column, array) else column
+                             for key, column in self._columns.items()})
+
+    def __len__(self):
+        return self._num_rows
@@ -44,7 +44,7 @@ class ExpectedDataflashLog:
         self.mode_counter = table_types.ModeCounter()
 
     def count(self, heartbeat_msg):
-        self.mode_counter.count(heartbeat_msg.to_dict())
+        self.mode_counter.count(heartbeat_msg)
 
     def report(self):
         print(f'>>> Reference {self.name}, first {self.first_time_boot_s :.2f}s, last {self.last_time_boot_s :.2f}s')
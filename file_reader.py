@@ -21,7 +21,10 @@ class FileReader(NamedReader):
         self.count = 0
         self.first_ts = None
         self.last_ts = None
-        self.types = types
+
+        # recv_match checks every message against this, a set makes that a hash lookup
+        # Note: recv_match accepts a list or a set, but a frozenset would be treated as a single type
+        self.types = None if types is None else set(types)
 
         self._conn = mavutil.mavlink_connection(path, dialect='ardupilotmega')
 
@@ -38,7 +41,8 @@ class FileReader(NamedReader):
             raise StopIteration
         else:
             self.count += 1
-            self.last_ts = getattr(msg, '_timestamp', 0.0)
+            # pymavlink sets _timestamp on every message it reads from a log file
+            self.last_ts = msg._timestamp
             if self.first_ts is None:
                 self.first_ts = self.last_ts
             return msg
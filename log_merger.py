@@ -1,8 +1,111 @@
+import numpy as np
 import pandas as pd
 
 import util
 
 
+def plan_merge(named_dfs: list[tuple[str, pd.DataFrame]], max_rows: int, verbose: bool) \
+        -> tuple[np.ndarray, list[np.ndarray]]:
+    """
+    Plan a merge of dataframes on timestamp with forward-fill. This matches a chain of
+    pd.merge_ordered(merged_df, df, on='timestamp', fill_method='ffill') calls, but the merged dataframe is never copied
+    as it grows.
+
+    Rows from different tables with the same timestamp are combined. Rows from one table with the same timestamp each
+    get their own merged row (merge_ordered would build the cross product if several tables did this).
+    As with merge_ordered, a column is filled from the most recent row of its table, so NaN values are preserved.
+
+    Like the merge_ordered chain, stop adding tables once the merged dataframe has more than max_rows rows.
+
+    Returns the merged timestamps, and for each table that made the cut, the table row to use for each merged row
+    (-1 if the table has no rows yet).
+    """
+    if verbose:
+        print(f'Starting with {len(named_dfs[0][1])} {named_dfs[0][0]} rows')
+
+    if len(named_dfs) == 1:
+        df = named_dfs[0][1]
+        return df['timestamp'].to_numpy(), [np.arange(len(df))]
+
+    # Key each row by (timestamp, rank), where rank separates rows in a table that share a timestamp
+    orders = []
+    keys = []
+    for _, df in named_dfs:
+        order = np.argsort(df['timestamp'].to_numpy(), kind='stable')
+        timestamps = df['timestamp'].to_numpy()[order]
+        key = np.empty(len(df), dtype=[('timestamp', np.float64), ('rank', np.int64)])
+        key['timestamp'] = timestamps
+        key['rank'] = np.arange(len(df)) - np.searchsorted(timestamps, timestamps, side='left')
+        orders.append(order)
+        keys.append(key)
+
+    # The merged rows are the unique keys, find the first table that contributes each one
+    all_keys, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+    table_ids = np.repeat(np.arange(len(keys)), [len(key) for key in keys])
+    first_table = np.full(len(all_keys), len(keys))
+    np.minimum.at(first_table, inverse, table_ids)
+    num_rows = np.cumsum(np.bincount(first_table, minlength=len(keys)))
+
+    # Check the size after each table is added, just like the merge_ordered chain
+    num_tables = len(keys)
+    for i in range(1, len(keys)):
+        if verbose:
+            print(f'Merging {len(named_dfs[i][1])} {named_dfs[i][0]} rows')
+            print(f'Merged dataframe has {num_rows[i]} rows')
+        if num_rows[i] > max_rows:
+            print('Merged dataframe is too big, stopping')
+            num_tables = i + 1
+            break
+
+    rows = first_table < num_tables
+    merged_keys = all_keys[rows]
+    starts = np.cumsum([0] + [len(key) for key in keys])
+    row_numbers = np.cumsum(rows) - 1
+
+    timestamp_dtype = np.result_type(*(df['timestamp'].dtype for _, df in named_dfs[:num_tables]))
+    indexers = []
+    for i in range(num_tables):
+        # For each merged row, find the most recent row in this table
+        latest = np.full(len(merged_keys), -1)
+        latest[row_numbers[inverse[starts[i]:starts[i + 1]]]] = np.arange(len(keys[i]))
+        latest = np.maximum.accumulate(latest)
+        indexers.append(np.where(latest < 0, -1, orders[i][latest]))
+
+    return merged_keys['timestamp'].astype(timestamp_dtype), indexers
+
+
+def iter_merged_dataframes(named_dfs: list[tuple[str, pd.DataFrame]], timestamps: np.ndarray,
+                           indexers: list[np.ndarray], chunk_rows: int = 100000):
+    """
+    Build the merged dataframe planned by plan_merge, chunk_rows rows at a time.
+    """
+    # Columns that need fill values are promoted (e.g., int to float) in every chunk, not just the chunks with gaps
+    columns = []
+    for (_, df), indexer in zip(named_dfs, indexers):
+        has_gaps = len(indexer) > 0 and indexer[0] < 0
+        for column in df.columns:
+            if column != 'timestamp':
+                values = df[column].to_numpy()
+                dtype = pd.api.extensions.take(values, [-1], allow_fill=True).dtype if has_gaps else values.dtype
+                columns.append((column, values, dtype, indexer))
+
+    for start in range(0, max(len(timestamps), 1), chunk_rows):
+        stop = min(start + chunk_rows, len(timestamps))
+        chunk = {'timestamp': timestamps[start:stop]}
+        for column, values, dtype, indexer in columns:
+            chunk[column] = pd.api.extensions.take(values, indexer[start:stop], allow_fill=True).astype(dtype,
+                                                                                                        copy=False)
+        yield pd.DataFrame(chunk, index=pd.RangeIndex(start, stop))
+
+
+def merge_dataframes(named_dfs: list[tuple[str, pd.DataFrame]], max_rows: int, verbose: bool) -> pd.DataFrame:
+    """
+    Merge dataframes on timestamp and forward-fill, see plan_merge.
+    """
+    timestamps, indexers = plan_merge(named_dfs, max_rows, verbose)
+    return next(iter_merged_dataframes(named_dfs, timestamps, indexers, max(len(timestamps), 1)))
+
+
 class LogMerger:
     def __init__(self,
                  infile: str,
@@ -25,31 +128,23 @@ class LogMerger:
                 df.to_csv(filename)
 
     def write_merged_csv_file(self):
-        merged_df = None
         print(f'Merging dataframes')
+        named_dfs = []
         for table_name in self.tables:
             df = self.tables[table_name].get_dataframe(self.verbose)
             if df.empty:
                 if self.verbose:
                     print(f'{table_name} empty, skipping')
             else:
-                if merged_df is None:
-                    if self.verbose:
-                        print(f'Starting with {len(df)} {table_name} rows')
-                    merged_df = df
-                else:
-                    if self.verbose:
-                        print(f'Merging {len(df)} {table_name} rows')
-                    merged_df = pd.merge_ordered(merged_df, df, on='timestamp', fill_method='ffill')
-                    if self.verbose:
-                        print(f'Merged dataframe has {len(merged_df)} rows')
-                    if len(merged_df) > self.max_rows:
-                        print('Merged dataframe is too big, stopping')
-                        break
-
-        if merged_df is None:
+                named_dfs.append((table_name, df))
+
+        if not named_dfs:
             print(f'Nothing to write')
         else:
+            # Write the merged dataframe a chunk at a time, the whole thing can be very large
+            timestamps, indexers = plan_merge(named_dfs, self.max_rows, self.verbose)
             filename = util.get_outfile_name(self.infile)
-            print(f'Writing {len(merged_df)} rows to {filename}')
-            merged_df.to_csv(filename)
+            print(f'Writing {len(timestamps)} rows to {filename}')
+            with open(filename, 'w', newline='') as file:
+                for chunk in iter_merged_dataframes(named_dfs, timestamps, indexers):
+                    chunk.to_csv(file, header=chunk.index.start == 0)
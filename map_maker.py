@@ -62,7 +62,7 @@ class MapMaker:
         folium.PolyLine(df[[lat_col, lon_col]].values, color=color, weight=1).add_to(self.m)
 
         if marker_function is not None:
-            for index, row in df.iterrows():
+            for row in util.iter_rows(df):
                 marker = marker_function(row)
                 if marker is not None:
                     marker.add_to(self.m)
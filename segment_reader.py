@@ -61,7 +61,7 @@ class SegmentReader(NamedReader):
                 # Try again
                 continue
 
-            timestamp = getattr(msg, '_timestamp', 0.0)
+            timestamp = msg._timestamp
 
             # Ignore messages before the segment start
             if timestamp < self._segment.start:
@@ -1,11 +1,17 @@
 #!/usr/bin/env python3
 import enum
 import math
+import sys
+from array import array
+from collections import Counter
+from typing import Callable
 
+import numpy as np
 import pandas as pd
 import pymavlink.dialects.v20.ardupilotmega as apm
 
 import util
+from column_buffer import ColumnBuffer
 
 # Look at tables with time_boot_ms fields. Findings:
 # DISTANCE_SENSOR from BlueOS is off by ~450s, so it can't be trusted
@@ -13,24 +19,16 @@ import util
 # tables_with_time_boot_ms = []
 
 
-def norm_angle_d(degrees: float) -> float:
-    """Normalize angle to [-180, 180) degrees"""
+def norm_angles_d(degrees: np.ndarray) -> np.ndarray:
+    """Normalize an array of angles to [-180, 180) degrees"""
 
-    while degrees >= 180:
-        degrees -= 360
-    while degrees < -180:
-        degrees += 360
-    return degrees
+    return np.mod(degrees + 180.0, 360.0) - 180.0
 
 
-def norm_angle_r(radians: float) -> float:
-    """Normalize angle to [-pi, pi) radians"""
+def norm_angles_r(radians: np.ndarray) -> np.ndarray:
+    """Normalize an array of angles to [-pi, pi) radians"""
 
-    while radians >= math.pi:
-        radians -= 2 * math.pi
-    while radians < -math.pi:
-        radians += 2 * math.pi
-    return radians
+    return np.mod(radians + math.pi, 2 * math.pi) - math.pi
 
 
 # Sub modes: https://mavlink.io/en/messages/ardupilotmega.html#SUB_MODE
@@ -80,6 +78,12 @@ def combined_mode(base_mode: int, custom_mode: int) -> int:
         return Mode.DISARMED
 
 
+def combined_modes(base_mode: np.ndarray, custom_mode: np.ndarray) -> np.ndarray:
+    """Vectorized combined_mode"""
+
+    return np.where(base_mode >= 128, custom_mode, int(Mode.DISARMED))
+
+
 def mode_name(mode: int) -> str:
     if mode in MODE_NAMES:
         return MODE_NAMES[mode]
@@ -96,12 +100,23 @@ def sys_name(sys_id: int) -> str:
         return 'unknown'
 
 
+# The enums are static, so build the name lookups once
+COMP_NAMES = {comp_id: entry.name.lower() for comp_id, entry in apm.enums['MAV_COMPONENT'].items()}
+STATE_NAMES = {state_id: entry.name.lower() for state_id, entry in apm.enums['MAV_STATE'].items()}
+SEVERITY_NAMES = {
+    apm.MAV_SEVERITY_CRITICAL: 'CRITICAL',
+    apm.MAV_SEVERITY_ERROR: 'ERROR',
+    apm.MAV_SEVERITY_WARNING: 'WARNING',
+    apm.MAV_SEVERITY_INFO: 'INFO',
+}
+
+
 def comp_name(comp_id: int) -> str:
-    return apm.enums['MAV_COMPONENT'][comp_id].name.lower()
+    return COMP_NAMES.get(comp_id, 'unknown')
 
 
 def state_name(state_id: int) -> str:
-    return apm.enums['MAV_STATE'][state_id].name.lower()
+    return STATE_NAMES.get(state_id, 'unknown')
 
 
 def system_status_name(state_id: int) -> str:
@@ -116,14 +131,8 @@ def system_status_name(state_id: int) -> str:
 
 
 def status_severity_name(severity: int) -> str:
-    if severity == apm.MAV_SEVERITY_CRITICAL:
-        return 'CRITICAL'
-    elif severity == apm.MAV_SEVERITY_ERROR:
-        return 'ERROR'
-    elif severity == apm.MAV_SEVERITY_WARNING:
-        return 'WARNING'
-    elif severity == apm.MAV_SEVERITY_INFO:
-        return 'INFO'
+    if severity in SEVERITY_NAMES:
+        return SEVERITY_NAMES[severity]
     else:
         return f'severity {severity}'
 
@@ -131,16 +140,15 @@ def status_severity_name(severity: int) -> str:
 class ModeCounter:
     """Count seconds spent in the various [combined] modes"""
     def __init__(self):
-        self.modes = {}
+        self.modes = Counter()
 
-    def count(self, heartbeat_data: dict):
-        mode = mode_name(combined_mode(heartbeat_data['base_mode'], heartbeat_data['custom_mode']))
-        if mode not in self.modes:
-            self.modes[mode] = 0
-        self.modes[mode] += 1
+    def count(self, heartbeat_msg):
+        self.modes[mode_name(combined_mode(heartbeat_msg.base_mode, heartbeat_msg.custom_mode))] += 1
 
 
 class Table:
+    __slots__ = ('_table_name', '_columns', '_df', '_list_keys', '_rate_keys')
+
     @staticmethod
     def create_table(
             msg_type: str,
@@ -152,41 +160,40 @@ class Table:
         if table_name is None:
             table_name = msg_type
 
-        if msg_type == 'AHRS2':
-            return AHRS2Table(table_name)
-        elif msg_type == 'BATTERY_STATUS':
-            return BatteryStatusTable(table_name)
-        elif msg_type == 'DISTANCE_SENSOR':
-            return DistanceSensorTable(table_name)
-        elif msg_type == 'HEARTBEAT':
-            return HeartbeatTable(table_name)
-        elif msg_type == 'GLOBAL_POSITION_INT':
-            return GPSTable(msg_type, table_name, hdop_max, filter_bad)
-        elif msg_type == 'GPS_INPUT':
-            return GPSTable(msg_type, table_name, hdop_max, filter_bad)
-        elif msg_type == 'GPS_RAW_INT':
-            return GPSTable(msg_type, table_name, hdop_max, filter_bad)
-        elif msg_type == 'GPS2_RAW':
+        if msg_type in GPS_MSG_TYPES:
             return GPSTable(msg_type, table_name, hdop_max, filter_bad)
         elif msg_type == 'NAMED_VALUE_FLOAT':
             return NamedValueFloatTable(table_name, surftrak)
-        elif msg_type == 'RC_CHANNELS':
-            return RCChannelsTable(table_name)
-        elif msg_type == 'VISION_POSITION_DELTA':
-            return VisionPositionDeltaTable(table_name)
         else:
-            return Table(table_name)
+            return TABLE_CLASSES.get(msg_type, Table)(table_name)
 
-    def __init__(self, table_name: str):
+    def __init__(self, table_name: str, typecodes: dict[str, str] | None = None):
         self._table_name = table_name
-        self._rows = []
+
+        # typecodes maps a field to an array typecode, e.g., 'H' for uint16 fields, see ColumnBuffer
+        self._columns = ColumnBuffer({self.field_key(field): typecode for field, typecode in (typecodes or {}).items()})
         self._df = None
 
+        # Keys of fields that have array values, found in the first row
+        self._list_keys = None
+
+        # Keys of the rate fields, get_dataframe moves these after any fields added by build_dataframe
+        self._rate_keys = []
+
+    def field_key(self, field: str) -> str:
+        """
+        Return the key for a field in this table, e.g., 'GPS_INPUT.lat'. Subclasses build their keys once, in __init__.
+        Keys are interned so that dict lookups can usually match on identity.
+        """
+        return sys.intern(f'{self._table_name}.{field}')
+
     def append(self, row: dict):
         # Drop fields that have array values, they don't work well in csv files
-        for key in list(row.keys()):
-            if isinstance(row[key], list):
-                row.pop(key)
+        # The fields are the same for every message of a given type, so just look at the first row
+        if self._list_keys is None:
+            self._list_keys = tuple(key for key, value in row.items() if isinstance(value, list))
+        for key in self._list_keys:
+            row.pop(key, None)
 
         # global tables_with_time_boot_ms
         # for key in list(row.keys()):
@@ -195,14 +202,46 @@ class Table:
         #         print(f'{key_str} in seconds: {row[key_str] / 1000.0}')
         #         tables_with_time_boot_ms.append(key_str)
 
-        self._rows.append(row)
+        self._columns.append(row)
 
     def add_rate_field(self, half_n=10, field_name='rate'):
-        util.add_rate_field(self._rows, half_n, 4.0, f'{self._table_name}.{field_name}')
+        if len(self._columns) == 0:
+            return
+
+        rate_key = self.field_key(field_name)
+        rates = util.calc_rates(self._columns.column('timestamp'), half_n, 4.0, rate_key)
+        if rates is not None:
+            self._columns.set_column(rate_key, rates)
+            self._rate_keys.append(rate_key)
+
+    # Fields computed from other fields: (field, function), subclasses may add to this list
+    # The function is called with column(field) -> np.ndarray, and returns the new column
+    DERIVED_FIELDS: list[tuple[str, Callable]] = []
+
+    def build_dataframe(self):
+        """Build the dataframe from the rows, subclasses may add fields"""
+        df = self._columns.to_dataframe()
+        if df.empty or not self.DERIVED_FIELDS:
+            return df
+
+        def column(field: str) -> np.ndarray:
+            return df[self.field_key(field)].to_numpy()
+
+        # Compute each derived field for all rows at once
+        for field, derive in self.DERIVED_FIELDS:
+            df[self.field_key(field)] = derive(column)
+
+        return df
 
     def get_dataframe(self, verbose):
         if self._df is None:
-            self._df = pd.DataFrame(self._rows)
+            self._df = self.build_dataframe()
+
+            # The rate fields come last, after any fields added by build_dataframe
+            for rate_key in self._rate_keys:
+                if rate_key in self._df:
+                    self._df[rate_key] = self._df.pop(rate_key)
+
             if verbose:
                 print('-----------------')
                 if self._df.empty:
@@ -214,53 +253,70 @@ class Table:
         return self._df
 
     def __len__(self):
-        return len(self._rows)
+        return len(self._columns)
 
 
 class AHRS2Table(Table):
+    __slots__ = ()
+
     def __init__(self, table_name: str):
         super().__init__(table_name)
 
-    def append(self, row: dict):
-        # Add degree fields
-        row[f'{self._table_name}.roll_deg'] = math.degrees(row[f'{self._table_name}.roll'])
-        row[f'{self._table_name}.pitch_deg'] = math.degrees(row[f'{self._table_name}.pitch'])
-        row[f'{self._table_name}.yaw_deg'] = math.degrees(row[f'{self._table_name}.yaw'])
-        super().append(row)
+    # Add degree fields
+    DERIVED_FIELDS = [
+        ('roll_deg', lambda column: np.degrees(column('roll'))),
+        ('pitch_deg', lambda column: np.degrees(column('pitch'))),
+        ('yaw_deg', lambda column: np.degrees(column('yaw'))),
+    ]
 
 
 class BatteryStatusTable(Table):
+    __slots__ = ('_voltages_key', '_voltages')
+
     def __init__(self, table_name: str):
         super().__init__(table_name)
+        self._voltages_key = self.field_key('voltages')
+
+        # The voltages arrays are kept flat, one array per row, and sliced in build_dataframe
+        self._voltages = array('H')
 
     def append(self, row: dict):
-        # Grab the voltage of the first battery
-        row[f'{self._table_name}.voltage'] = row[f'{self._table_name}.voltages'][0]
+        # Take the array out of the row, the base class doesn't need to see it
+        self._voltages.extend(row.pop(self._voltages_key))
         super().append(row)
 
+    def build_dataframe(self):
+        df = super().build_dataframe()
+        if df.empty:
+            return df
+
+        # Grab the voltage of the first battery
+        voltages = np.frombuffer(self._voltages, dtype=np.uint16).reshape(len(df), -1)
+        df[self.field_key('voltage')] = voltages[:, 0].astype(np.int64)
+
+        return df
+
 
 class DistanceSensorTable(Table):
+    __slots__ = ()
+
     def __init__(self, table_name: str):
         super().__init__(table_name)
 
-    def append(self, row: dict):
-        row[f'{self._table_name}.current_distance_m'] = row[f'{self._table_name}.current_distance'] / 100.0
-        super().append(row)
+    DERIVED_FIELDS = [
+        ('current_distance_m', lambda column: column('current_distance') / 100.0),
+    ]
 
 
 class HeartbeatTable(Table):
+    __slots__ = ()
+
     def __init__(self, table_name: str):
         super().__init__(table_name)
 
-    def is_armed(self, row):
-        return is_armed(row[f'{self._table_name}.base_mode'])
-
-    def get_mode(self, row):
-        return combined_mode(row[f'{self._table_name}.base_mode'], row[f'{self._table_name}.custom_mode'])
-
-    def append(self, row: dict):
-        row[f'{self._table_name}.mode'] = self.get_mode(row)
-        super().append(row)
+    DERIVED_FIELDS = [
+        ('mode', lambda column: combined_modes(column('base_mode'), column('custom_mode'))),
+    ]
 
 
 class GPSTable(Table):
@@ -277,60 +333,88 @@ class GPSTable(Table):
     alt             GLOBAL_POSITION_INT (mm), GPS_INPUT (m)
     relative_alt    GLOBAL_POSITION_INT
     """
+    __slots__ = ('_msg_type', '_hdop_max', '_filter_bad', '_lat_key', '_lon_key', '_fix_type_key', '_hdop_key',
+                 '_eph_key', '_conversions')
+
     def __init__(self, msg_type: str, table_name: str, hdop_max: float, filter_bad: bool):
         super().__init__(table_name)
         self._msg_type = msg_type
         self._hdop_max = hdop_max
         self._filter_bad = filter_bad
 
-    def append(self, row: dict):
-        def field(f: str):
-            return f'{self._table_name}.{f}'
+        # Build the keys used by the filter once, and only for the fields that this msg_type has (see above)
+        self._lat_key = self.field_key('lat')
+        self._lon_key = self.field_key('lon')
+        has_fix_type = msg_type in ('GPS_INPUT', 'GPS_RAW_INT', 'GPS2_RAW')
+        self._fix_type_key = self.field_key('fix_type') if has_fix_type else None
+        self._hdop_key = self.field_key('hdop') if msg_type == 'GPS_INPUT' else None
+        self._eph_key = self.field_key('eph') if msg_type in ('GPS_RAW_INT', 'GPS2_RAW') else None
+
+        # Conversions to degrees and meters for convenience: (field, converted field, divisor)
+        # These are done in build_dataframe, one vectorized pass per column
+        conversions = [('lat', 'lat_deg', 1.0e7), ('lon', 'lon_deg', 1.0e7), ('hdg', 'hdg_deg', 100.0),
+                       ('yaw', 'yaw_deg', 100.0)]
+        if msg_type == 'GLOBAL_POSITION_INT':
+            conversions += [('alt', 'alt_m', 1000.0), ('relative_alt', 'relative_alt_m', 1000.0)]
+        self._conversions = [(self.field_key(f), self.field_key(c), d) for f, c, d in conversions]
+
+    def is_bad(self, row: dict) -> bool:
+        """Check the raw fields, before any conversion work is done"""
+        if row[self._lat_key] == 0 and row[self._lon_key] == 0:
+            return True
+        if self._fix_type_key is not None and row[self._fix_type_key] < 3:
+            return True
+        if self._hdop_key is not None and row[self._hdop_key] > self._hdop_max:
+            return True
+        # eph is hdop * 100, divide eph rather than multiply hdop_max, which can round the other way
+        if self._eph_key is not None and row[self._eph_key] / 100.0 > self._hdop_max:
+            return True
+        return False
 
+    def append(self, row: dict):
         # Warm up messages have lat=0, lon=0, fix_type<3, hdop>max, etc.
         # This makes graphing a pain, so drop these rows
-        if self._filter_bad:
-            if row[field('lat')] == 0 and row[field('lon')] == 0:
-                return
-            if field('fix_type') in row and row[field('fix_type')] < 3:
-                return
-            if field('hdop') in row and row[field('hdop')] > self._hdop_max:
-                return
-            if field('eph') in row and row[field('eph')] / 100.0 > self._hdop_max:
-                return
-
-        # Convert to degrees and meters for convenience
-        row[field('lat_deg')] = row[field('lat')] / 1.0e7
-        row[field('lon_deg')] = row[field('lon')] / 1.0e7
-        if self._msg_type == 'GLOBAL_POSITION_INT':
-            row[field('hdg_deg')] = row[field('hdg')] / 100.0
-            row[field('alt_m')] = row[field('alt')] / 1000.0
-            row[field('relative_alt_m')] = row[field('relative_alt')] / 1000.0
-        if field('yaw') in row:
-            row[field('yaw_deg')] = row[field('yaw')] / 100.0
+        if self._filter_bad and self.is_bad(row):
+            return
 
         super().append(row)
 
+    def build_dataframe(self):
+        df = super().build_dataframe()
+        if df.empty:
+            return df
+
+        # Some fields are optional, e.g., yaw is a MAVLink 2 extension, missing values become NaN
+        for key, converted_key, divisor in self._conversions:
+            if key in df:
+                df[converted_key] = df[key].to_numpy(dtype=float) / divisor
+
+        return df
+
 
 class NamedValueFloatTable(Table):
+    __slots__ = ('surftrak',)
+
     def __init__(self, table_name: str, surftrak):
         super().__init__(table_name)
         self.surftrak = surftrak
 
-    def get_one_named_value_float_type(self, input_df, name: str):
+    def get_one_named_value_float_type(self, groups: dict, empty_df, name: str):
+        value_key = self.field_key('value')
+
         # Get a subset of rows
-        df = input_df[input_df[f'{self._table_name}.name'] == name]
+        df = groups.get(name, empty_df)
 
         # Get a subset of columns
-        df = df[['timestamp', f'{self._table_name}.value']]
+        df = df[['timestamp', value_key]]
 
         # Rename one column
-        return df.rename(columns={f'{self._table_name}.value': f'SUB_INFO.{name}'})
+        return df.rename(columns={value_key: f'SUB_INFO.{name}'})
 
     def get_dataframe(self, verbose):
         if self._df is None:
             # Create the NAMED_VALUE_FLOAT dataframe, which is a set of key-value pairs
-            named_value_float_df = pd.DataFrame(self._rows)
+            named_value_float_df = self.build_dataframe()
 
             if verbose:
                 print('-----------------')
@@ -344,8 +428,13 @@ class NamedValueFloatTable(Table):
             # fine-grained this may result in an explosion of data, so let's just do this for a few key columns.
             interesting_fields = ['RFTarget'] if self.surftrak else ['Lights2', 'PilotGain']
             print(f'Save these NAMED_VALUE_FLOAT fields: {interesting_fields}')
+
+            # Partition the rows by name in a single pass, rather than scanning all rows once per name
+            groups = dict(list(named_value_float_df.groupby(self.field_key('name'), sort=False)))
+            empty_df = named_value_float_df.iloc[:0]
+
             for interesting_field in interesting_fields:
-                df = self.get_one_named_value_float_type(named_value_float_df, interesting_field)
+                df = self.get_one_named_value_float_type(groups, empty_df, interesting_field)
                 self._df = df if self._df is None else pd.merge_ordered(self._df, df)
 
             if verbose:
@@ -359,86 +448,93 @@ class NamedValueFloatTable(Table):
 
 
 class RCChannelsTable(Table):
+    __slots__ = ('_rename_map',)
+
     def __init__(self, table_name: str):
-        super().__init__(table_name)
+        # The raw channel values are uint16
+        super().__init__(table_name, {f'chan{i}_raw': 'H' for i in range(1, 19)})
+
+        # Rename a few fields for ease-of-use
+        self._rename_map = {self.field_key(f'chan{item[0]}_raw'): self.field_key(f'chan{item[0]}_raw_{item[1]}')
+                            for item in RCChannelsTable.RC_MAP}
 
     RC_MAP = [(1, 'pitch'), (2, 'roll'), (3, 'throttle'), (4, 'yaw'), (5, 'forward'), (6, 'lateral')]
 
+    def build_dataframe(self):
+        df = super().build_dataframe()
+
+        # Rename the columns once, rather than renaming the fields in every row
+        # The renamed columns go at the end, in RC_MAP order
+        columns = [key for key in df.columns if key not in self._rename_map]
+        columns += [key for key in self._rename_map if key in df.columns]
+        return df[columns].rename(columns=self._rename_map)
+
+
+class VisionPositionDeltaTable(Table):
+    __slots__ = ('_angle_delta_key', '_position_delta_key', '_angle_deltas', '_position_deltas')
+
+    def __init__(self, table_name: str):
+        super().__init__(table_name)
+        self._angle_delta_key = self.field_key('angle_delta')
+        self._position_delta_key = self.field_key('position_delta')
+
+        # The arrays are kept flat, 3 values per row, and expanded in build_dataframe
+        self._angle_deltas = array('d')
+        self._position_deltas = array('d')
+
     def append(self, row: dict):
-        # Rename a few fields for ease-of-use
-        for item in RCChannelsTable.RC_MAP:
-            row[f'{self._table_name}.chan{item[0]}_raw_{item[1]}'] = row.pop(f'{self._table_name}.chan{item[0]}_raw')
+        # Take the arrays out of the row, the base class doesn't need to see them
+        self._angle_deltas.extend(row.pop(self._angle_delta_key))
+        self._position_deltas.extend(row.pop(self._position_delta_key))
         super().append(row)
 
+    def build_dataframe(self):
+        df = super().build_dataframe()
+        if df.empty:
+            return df
 
-class Pose:
-    """Simple 6DoF pose"""
+        # Flatten the arrays: one reshape per array rather than indexing every row
+        angle_deltas = np.frombuffer(self._angle_deltas).reshape(-1, 3)
+        position_deltas = np.frombuffer(self._position_deltas).reshape(-1, 3)
 
-    def __init__(self, orientation: tuple[float, float, float], position: tuple[float, float, float]):
-        self.orientation = orientation
-        self.position = position
+        # Accumulate deltas to build a pose
+        # Assume initial pose is flat (roll=0.0, pitch=0.0) facing north (yaw=0.0) at location (0.0, 0.0, 0.0)
 
-    def add_angle_delta(self, angle_delta):
         # VISION_POSITION_DELTA.angle_delta should be radians, but there's a bug in the WL A50 DVL extension:
         # https://github.com/bluerobotics/BlueOS-Water-Linked-DVL/issues/36
         is_degrees = False
-        if is_degrees:
-            self.orientation = (
-                norm_angle_d(self.orientation[0] + angle_delta[0]),
-                norm_angle_d(self.orientation[1] + angle_delta[1]),
-                norm_angle_d(self.orientation[2] + angle_delta[2])
-            )
-        else:
-            self.orientation = (
-                norm_angle_d(self.orientation[0] + math.degrees(angle_delta[0])),
-                norm_angle_d(self.orientation[1] + math.degrees(angle_delta[1])),
-                norm_angle_d(self.orientation[2] + math.degrees(angle_delta[2]))
-            )
+        norm_angles = norm_angles_d if is_degrees else norm_angles_r
 
-    def add_position_delta(self, position_delta):
-        # VISION_POSITION_DELTA.position_delta is in meters
-        self.position = (
-            self.position[0] + position_delta[0],
-            self.position[1] + position_delta[1],
-            self.position[2] + position_delta[2]
-        )
+        # Normalize the angle deltas, this doesn't change the normalized sum
+        angle_deltas = norm_angles(angle_deltas)
 
+        # Add all of the delta fields, then all of the pose fields
+        for i, axis in enumerate(('roll', 'pitch', 'yaw')):
+            df[f'{self._table_name}.{axis}_delta'] = angle_deltas[:, i]
 
-class VisionPositionDeltaTable(Table):
-    def __init__(self, table_name: str):
-        super().__init__(table_name)
-
-        # Assume initial pose is flat (roll=0.0, pitch=0.0) facing north (yaw=0.0) at location (0.0, 0.0, 0.0)
-        self.pose = Pose((0.0, 0.0, 0.0), (0.0, 0.0, 0.0))
+        # VISION_POSITION_DELTA.position_delta is in meters
+        for i, axis in enumerate(('x', 'y', 'z')):
+            df[f'{self._table_name}.{axis}_delta'] = position_deltas[:, i]
 
-    def append(self, row: dict):
-        # Flatten angle array, and normalize while we're at it
-        is_degrees = False
-        if is_degrees:
-            row[f'{self._table_name}.roll_delta'] = norm_angle_d(row[f'{self._table_name}.angle_delta'][0])
-            row[f'{self._table_name}.pitch_delta'] = norm_angle_d(row[f'{self._table_name}.angle_delta'][1])
-            row[f'{self._table_name}.yaw_delta'] = norm_angle_d(row[f'{self._table_name}.angle_delta'][2])
-        else:
-            row[f'{self._table_name}.roll_delta'] = norm_angle_r(row[f'{self._table_name}.angle_delta'][0])
-            row[f'{self._table_name}.pitch_delta'] = norm_angle_r(row[f'{self._table_name}.angle_delta'][1])
-            row[f'{self._table_name}.yaw_delta'] = norm_angle_r(row[f'{self._table_name}.angle_delta'][2])
+        angles = norm_angles_d(np.cumsum(angle_deltas if is_degrees else np.degrees(angle_deltas), axis=0))
+        for i, axis in enumerate(('roll', 'pitch', 'yaw')):
+            df[f'{self._table_name}.{axis}'] = angles[:, i]
 
-        # Flatten position array
-        row[f'{self._table_name}.x_delta'] = row[f'{self._table_name}.position_delta'][0]
-        row[f'{self._table_name}.y_delta'] = row[f'{self._table_name}.position_delta'][1]
-        row[f'{self._table_name}.z_delta'] = row[f'{self._table_name}.position_delta'][2]
+        positions = np.cumsum(position_deltas, axis=0)
+        for i, axis in enumerate(('x', 'y', 'z')):
+            df[f'{self._table_name}.{axis}'] = positions[:, i]
 
-        # Accumulate deltas to build a pose
-        self.pose.add_angle_delta(row[f'{self._table_name}.angle_delta'])
-        self.pose.add_position_delta(row[f'{self._table_name}.position_delta'])
+        return df
 
-        # Add pose fields
-        row[f'{self._table_name}.roll'] = self.pose.orientation[0]
-        row[f'{self._table_name}.pitch'] = self.pose.orientation[1]
-        row[f'{self._table_name}.yaw'] = self.pose.orientation[2]
 
-        row[f'{self._table_name}.x'] = self.pose.position[0]
-        row[f'{self._table_name}.y'] = self.pose.position[1]
-        row[f'{self._table_name}.z'] = self.pose.position[2]
+# Tables that need more than a table_name are handled in Table.create_table
+GPS_MSG_TYPES = ('GLOBAL_POSITION_INT', 'GPS_INPUT', 'GPS_RAW_INT', 'GPS2_RAW')
 
-        super().append(row)
+TABLE_CLASSES = {
+    'AHRS2': AHRS2Table,
+    'BATTERY_STATUS': BatteryStatusTable,
+    'DISTANCE_SENSOR': DistanceSensorTable,
+    'HEARTBEAT': HeartbeatTable,
+    'RC_CHANNELS': RCChannelsTable,
+    'VISION_POSITION_DELTA': VisionPositionDeltaTable,
+}
@@ -7,13 +7,19 @@
 # Run a particular test:
 # python -m pytest -rP testing/test_tools.py::TestTools::test_add_rate_field
 
+from array import array
+
+import numpy as np
+import pandas as pd
 import pytest
 
 import BIN_info
 import BIN_merge
+import log_merger
 import map_maker
 import plot_local_position
 import show_types
+import table_types
 import tlog_bad_data
 import tlog_info
 import tlog_map_maker
@@ -21,6 +27,7 @@ import tlog_merge
 import tlog_param
 import tlog_scan
 import util
+from column_buffer import ColumnBuffer
 from file_reader import FileReader
 from segment_reader import SegmentFormatException, Segment, SegmentReader, parse_segment
 
@@ -96,72 +103,71 @@ class TestTools:
         tool.read()
 
     def test_add_rate_field(self):
-        messages = [
-            {'timestamp': 0.0},
-            {'timestamp': 0.1122},
-            {'timestamp': 0.2532},
-            {'timestamp': 0.3432},
-            {'timestamp': 0.4974},
-            {'timestamp': 0.5342},
-            {'timestamp': 0.6324},
-            {'timestamp': 0.7883},
+        timestamps = np.array([
+            0.0,
+            0.1122,
+            0.2532,
+            0.3432,
+            0.4974,
+            0.5342,
+            0.6324,
+            0.7883,
             # First gap
-            {'timestamp': 10.0123},
-            {'timestamp': 10.1897},
-            {'timestamp': 10.2321},
-            {'timestamp': 10.3998},
-            {'timestamp': 10.4234},
-            {'timestamp': 10.5643},
-            {'timestamp': 10.6248},
-            {'timestamp': 10.7431},
+            10.0123,
+            10.1897,
+            10.2321,
+            10.3998,
+            10.4234,
+            10.5643,
+            10.6248,
+            10.7431,
             # Second gap, right near end
-            {'timestamp': 20.0123},
-            {'timestamp': 20.1328},
-            {'timestamp': 20.2888},
-        ]
+            20.0123,
+            20.1328,
+            20.2888,
+        ])
 
         # Look for crashes
-        util.add_rate_field(messages, 1, 4.0, 'rate')
-        util.add_rate_field(messages, 2, 4.0, 'rate')
-        util.add_rate_field(messages, 4, 4.0, 'rate')
-        util.add_rate_field(messages, 5, 4.0, 'rate')
-        util.add_rate_field(messages, 9, 4.0, 'rate')
+        for half_n in [1, 2, 4, 5, 9]:
+            util.calc_rates(timestamps, half_n, 4.0, 'rate')
 
         # Compare output at half_n == 3 to make sure we're calculating correctly
         rates = [
-            3.0 / (messages[3]['timestamp'] - messages[0]['timestamp']),
-            4.0 / (messages[4]['timestamp'] - messages[0]['timestamp']),
-            5.0 / (messages[5]['timestamp'] - messages[0]['timestamp']),
-            6.0 / (messages[6]['timestamp'] - messages[0]['timestamp']),
-            6.0 / (messages[7]['timestamp'] - messages[1]['timestamp']),
-            5.0 / (messages[7]['timestamp'] - messages[2]['timestamp']),
-            4.0 / (messages[7]['timestamp'] - messages[3]['timestamp']),
+            3.0 / (timestamps[3] - timestamps[0]),
+            4.0 / (timestamps[4] - timestamps[0]),
+            5.0 / (timestamps[5] - timestamps[0]),
+            6.0 / (timestamps[6] - timestamps[0]),
+            6.0 / (timestamps[7] - timestamps[1]),
+            5.0 / (timestamps[7] - timestamps[2]),
+            4.0 / (timestamps[7] - timestamps[3]),
 
             # First gap:
             0.0,
             0.0,
 
-            4.0 / (messages[12]['timestamp'] - messages[8]['timestamp']),
-            5.0 / (messages[13]['timestamp'] - messages[8]['timestamp']),
-            6.0 / (messages[14]['timestamp'] - messages[8]['timestamp']),
-            6.0 / (messages[15]['timestamp'] - messages[9]['timestamp']),
-            5.0 / (messages[15]['timestamp'] - messages[10]['timestamp']),
-            4.0 / (messages[15]['timestamp'] - messages[11]['timestamp']),
+            4.0 / (timestamps[12] - timestamps[8]),
+            5.0 / (timestamps[13] - timestamps[8]),
+            6.0 / (timestamps[14] - timestamps[8]),
+            6.0 / (timestamps[15] - timestamps[9]),
+            5.0 / (timestamps[15] - timestamps[10]),
+            4.0 / (timestamps[15] - timestamps[11]),
 
             # Second gap, right near the end:
             0.0,
             0.0,
 
-            2.0 / (messages[18]['timestamp'] - messages[16]['timestamp']),
+            2.0 / (timestamps[18] - timestamps[16]),
 
             # Last message:
             0.0,
         ]
 
-        util.add_rate_field(messages, 3, 4.0, 'rate')
+        assert pytest.approx(rates) == util.calc_rates(timestamps, 3, 4.0, 'rate')
 
-        for rate, message in zip(rates, messages):
-            assert pytest.approx(rate) == message['rate']
+        # Same thing, using a list of messages
+        messages = [{'timestamp': timestamp} for timestamp in timestamps]
+        util.add_rate_field(messages, 3, 4.0, 'rate')
+        assert pytest.approx(rates) == [message['rate'] for message in messages]
 
     def test_parse_segment_args(self):
         segments = []
@@ -175,3 +181,209 @@ class TestTools:
         s1, s2 = segments
         assert s1.start == 1683220546.0 and s1.end == 1683220547.0 and s1.name == 'foo'
         assert s2.start == 1683220546.0 and s2.end == 1683220547.0 and s2.name == '1683220546_1683220547'
+
+    def test_column_buffer(self):
+        columns = ColumnBuffer()
+        columns.append({'timestamp': 1.0, 'a': 1, 'b': 'foo'})
+        columns.append({'timestamp': 2.0, 'a': 2 ** 70, 'c': 3.0})
+        columns.append({'timestamp': 3.0, 'a': None, 'b': 'bar', 'c': 4.0})
+
+        assert len(columns) == 3
+        df = columns.to_dataframe()
+        assert list(df.columns) == ['timestamp', 'a', 'b', 'c']
+        assert list(df['timestamp']) == [1.0, 2.0, 3.0]
+        assert list(df['a'][:2]) == [1, 2 ** 70] and df['a'][2] is None
+        assert list(df['b']) == ['foo', None, 'bar']
+        assert df['c'].isna()[0] and list(df['c'][1:]) == [3.0, 4.0]
+        assert isinstance(columns.column('c'), array)
+
+        columns = ColumnBuffer({'a': 'H'})
+        columns.append({'a': 1500})
+        columns.append({'a': 65535})
+        assert columns.to_dataframe()['a'].dtype == 'uint16'
+
+    def test_iter_rows(self):
+        columns = ColumnBuffer()
+        columns.append({'lat': 47.0, 'lon': -122.0, 'name': 'a'})
+        columns.append({'lat': 47.5, 'lon': -122.5, 'name': 'b'})
+
+        rows = list(util.iter_rows(columns.to_dataframe()))
+        assert rows == [{'lat': 47.0, 'lon': -122.0, 'name': 'a'}, {'lat': 47.5, 'lon': -122.5, 'name': 'b'}]
+
+    def test_read_fields(self):
+        class Msg:
+            def __init__(self, fix_type, timestamp):
+                self.fix_type = fix_type
+                self._timestamp = timestamp
+
+        fields = util.read_fields([Msg(3, 1.5), Msg(0, 2.5)], {'fix_type': 'B', '_timestamp': 'd'})
+        assert fields['fix_type'].dtype == np.uint8 and list(fields['fix_type']) == [3, 0]
+        assert list(fields['_timestamp']) == [1.5, 2.5]
+        assert len(util.read_fields([], {'fix_type': 'B'})['fix_type']) == 0
+
+    def test_merge_dataframes(self):
+        a = pd.DataFrame({'timestamp': [1.0, 3.0, 2.0, 3.0], 'a.x': [10, 30, 20, 31]})
+        b = pd.DataFrame({'timestamp': [0.5, 2.0, 4.0], 'b.y': [1.5, np.nan, 2.5]})
+        c = pd.DataFrame({'timestamp': [3.0], 'c.z': ['foo']})
+
+        # Should match a chain of merge_ordered calls
+        expected = pd.merge_ordered(a, b, on='timestamp', fill_method='ffill')
+        expected = pd.merge_ordered(expected, c, on='timestamp', fill_method='ffill')
+        merged = log_merger.merge_dataframes([('a', a), ('b', b), ('c', c)], 10000, False)
+        pd.testing.assert_frame_equal(expected, merged)
+
+        # Stop adding tables once the merged dataframe is too big
+        merged = log_merger.merge_dataframes([('a', a), ('b', b), ('c', c)], 5, False)
+        assert list(merged.columns) == ['timestamp', 'a.x', 'b.y']
+
+    def test_gps_eph_filter(self):
+        # eph is hdop * 100, a row right at hdop_max is good, even if hdop_max * 100.0 rounds down
+        for hdop_max in [0.29, 0.57, 1.15, 2.3]:
+            table = table_types.Table.create_table('GPS_RAW_INT', hdop_max=hdop_max, filter_bad=True)
+            eph = round(hdop_max * 100)
+            for timestamp, row_eph in [(1.0, eph), (2.0, eph + 1)]:
+                table.append({'timestamp': timestamp, 'GPS_RAW_INT.lat': 473000000, 'GPS_RAW_INT.lon': -1223000000,
+                              'GPS_RAW_INT.fix_type': 3, 'GPS_RAW_INT.eph': row_eph})
+            assert len(table) == 1
+
+    def test_table_rate_field(self):
+        table = table_types.Table.create_table('AHRS2')
+        for i in range(5):
+            table.append({'timestamp': float(i), 'AHRS2.roll': 0.0, 'AHRS2.pitch': np.pi / 2, 'AHRS2.yaw': -np.pi})
+        table.add_rate_field(2)
+        df = table.get_dataframe(False)
+
+        # The rate field comes after all other fields
+        assert list(df.columns) == ['timestamp', 'AHRS2.roll', 'AHRS2.pitch', 'AHRS2.yaw', 'AHRS2.roll_deg',
+                                    'AHRS2.pitch_deg', 'AHRS2.yaw_deg', 'AHRS2.rate']
+        assert list(df['AHRS2.pitch_deg']) == [90.0] * 5 and list(df['AHRS2.yaw_deg']) == [-180.0] * 5
+
+    def test_named_value_float(self):
+        def row(timestamp, name, value):
+            return {'timestamp': timestamp, 'NAMED_VALUE_FLOAT.name': name, 'NAMED_VALUE_FLOAT.value': value}
+
+        # Every sample gets its own row, even if it shares a timestamp or has a NaN value
+        table = table_types.Table.create_table('NAMED_VALUE_FLOAT', surftrak=True)
+        for r in [row(1.0, 'RFTarget', 1.0), row(1.0, 'RFTarget', 2.0), row(2.0, 'Lights2', 0.5),
+                  row(3.0, 'RFTarget', np.nan)]:
+            table.append(r)
+        df = table.get_dataframe(False)
+        assert list(df.columns) == ['timestamp', 'SUB_INFO.RFTarget']
+        assert list(df['timestamp']) == [1.0, 1.0, 3.0]
+        assert list(df['SUB_INFO.RFTarget'][:2]) == [1.0, 2.0] and np.isnan(df['SUB_INFO.RFTarget'].iloc[2])
+
+        # Samples with different names and the same timestamp share a row
+        table = table_types.Table.create_table('NAMED_VALUE_FLOAT')
+        for r in [row(1.0, 'Lights2', 1.0), row(1.0, 'PilotGain', 0.5), row(2.0, 'PilotGain', np.nan)]:
+            table.append(r)
+        df = table.get_dataframe(False)
+        assert list(df.columns) == ['timestamp', 'SUB_INFO.Lights2', 'SUB_INFO.PilotGain']
+        assert list(df['timestamp']) == [1.0, 2.0]
+        assert df['SUB_INFO.Lights2'][0] == 1.0 and df['SUB_INFO.PilotGain'][0] == 0.5
+        assert df[['SUB_INFO.Lights2', 'SUB_INFO.PilotGain']].iloc[1].isna().all()
+
+    def test_vision_position_delta(self):
+        table = table_types.Table.create_table('VISION_POSITION_DELTA')
+        table.append({'timestamp': 1.0,
+                      'VISION_POSITION_DELTA.angle_delta': [0.1 + 2 * np.pi, 0.0, 3.0],
+                      'VISION_POSITION_DELTA.position_delta': [1.0, 2.0, 3.0],
+                      'VISION_POSITION_DELTA.confidence': 90.0})
+        table.append({'timestamp': 2.0,
+                      'VISION_POSITION_DELTA.angle_delta': [0.0, -0.2, 1.0],
+                      'VISION_POSITION_DELTA.position_delta': [0.5, 0.0, -1.0],
+                      'VISION_POSITION_DELTA.confidence': 95.0})
+        df = table.get_dataframe(False)
+
+        # All of the delta fields come before the pose fields
+        axes = ['roll', 'pitch', 'yaw', 'x', 'y', 'z']
+        assert list(df.columns) == (['timestamp', 'VISION_POSITION_DELTA.confidence'] +
+                                    [f'VISION_POSITION_DELTA.{axis}_delta' for axis in axes] +
+                                    [f'VISION_POSITION_DELTA.{axis}' for axis in axes])
+
+        # Angle deltas are normalized to [-pi, pi) radians, the pose angles are normalized to [-180, 180) degrees
+        assert np.allclose(df['VISION_POSITION_DELTA.roll_delta'], [0.1, 0.0])
+        assert np.allclose(df['VISION_POSITION_DELTA.roll'], [np.degrees(0.1), np.degrees(0.1)])
+        assert np.allclose(df['VISION_POSITION_DELTA.pitch'], [0.0, np.degrees(-0.2)])
+        assert np.allclose(df['VISION_POSITION_DELTA.yaw'], [np.degrees(3.0), np.degrees(4.0) - 360.0])
+
+        # Position is the sum of the position deltas
+        assert list(df['VISION_POSITION_DELTA.x']) == [1.0, 1.5]
+        assert list(df['VISION_POSITION_DELTA.y']) == [2.0, 2.0]
+        assert list(df['VISION_POSITION_DELTA.z']) == [3.0, 2.0]
+
+    def test_rc_channels(self):
+        table = table_types.Table.create_table('RC_CHANNELS')
+        row = {'timestamp': 1.0, 'RC_CHANNELS.chancount': 16}
+        row.update({f'RC_CHANNELS.chan{i}_raw': 1500 + i for i in range(1, 19)})
+        row['RC_CHANNELS.rssi'] = 255
+        table.append(row)
+        df = table.get_dataframe(False)
+
+        # The mapped channels are renamed and moved to the end
+        renamed = ['chan1_raw_pitch', 'chan2_raw_roll', 'chan3_raw_throttle', 'chan4_raw_yaw', 'chan5_raw_forward',
+                   'chan6_raw_lateral']
+        assert list(df.columns) == (['timestamp', 'RC_CHANNELS.chancount'] +
+                                    [f'RC_CHANNELS.chan{i}_raw' for i in range(7, 19)] +
+                                    ['RC_CHANNELS.rssi'] + [f'RC_CHANNELS.{name}' for name in renamed])
+        assert [df[f'RC_CHANNELS.{name}'][0] for name in renamed] == [1501, 1502, 1503, 1504, 1505, 1506]
+        assert df['RC_CHANNELS.chan1_raw_pitch'].dtype == 'uint16'
+
+    def test_gps_table(self):
+        def gps_input(timestamp, lat, lon, fix_type, hdop):
+            return {'timestamp': timestamp, 'GPS_INPUT.lat': lat, 'GPS_INPUT.lon': lon, 'GPS_INPUT.fix_type': fix_type,
+                    'GPS_INPUT.hdop': hdop, 'GPS_INPUT.alt': 10.5, 'GPS_INPUT.yaw': 9000}
+
+        rows = [
+            gps_input(1.0, 473000000, -1223000000, 3, 1.0),  # hdop == hdop_max is good
+            gps_input(2.0, 473000000, -1223000000, 3, 1.01),  # hdop > hdop_max
+            gps_input(3.0, 473000000, -1223000000, 2, 0.5),  # fix_type < 3
+            gps_input(4.0, 0, 0, 3, 0.5),  # lat == lon == 0
+            gps_input(5.0, 0, -1225000000, 3, 0.5),
+        ]
+
+        table = table_types.Table.create_table('GPS_INPUT', hdop_max=1.0, filter_bad=True)
+        for row in rows:
+            table.append(dict(row))
+        df = table.get_dataframe(False)
+        assert list(df['timestamp']) == [1.0, 5.0]
+        assert pytest.approx(list(df['GPS_INPUT.lat_deg'])) == [47.3, 0.0]
+        assert pytest.approx(list(df['GPS_INPUT.lon_deg'])) == [-122.3, -122.5]
+        assert list(df['GPS_INPUT.yaw_deg']) == [90.0, 90.0]
+        assert 'GPS_INPUT.alt_m' not in df
+
+        # Nothing is dropped if filter_bad is False
+        table = table_types.Table.create_table('GPS_INPUT', hdop_max=1.0)
+        for row in rows:
+            table.append(dict(row))
+        assert len(table.get_dataframe(False)) == len(rows)
+
+        # GPS_RAW_INT has eph (hdop * 100) instead of hdop
+        table = table_types.Table.create_table('GPS_RAW_INT', hdop_max=1.0, filter_bad=True)
+        for timestamp, eph in [(1.0, 100), (2.0, 101)]:
+            table.append({'timestamp': timestamp, 'GPS_RAW_INT.lat': 473000000, 'GPS_RAW_INT.lon': -1223000000,
+                          'GPS_RAW_INT.fix_type': 3, 'GPS_RAW_INT.eph': eph})
+        assert list(table.get_dataframe(False)['timestamp']) == [1.0]
+
+        # GLOBAL_POSITION_INT has no fix_type, and converts alt and relative_alt from mm to m
+        table = table_types.Table.create_table('GLOBAL_POSITION_INT', filter_bad=True)
+        for timestamp, lat, lon in [(1.0, 473000000, -1223000000), (2.0, 0, 0)]:
+            table.append({'timestamp': timestamp, 'GLOBAL_POSITION_INT.lat': lat, 'GLOBAL_POSITION_INT.lon': lon,
+                          'GLOBAL_POSITION_INT.alt': -2500, 'GLOBAL_POSITION_INT.relative_alt': 1500,
+                          'GLOBAL_POSITION_INT.hdg': 18000})
+        df = table.get_dataframe(False)
+        assert list(df['timestamp']) == [1.0]
+        assert list(df['GLOBAL_POSITION_INT.alt_m']) == [-2.5]
+        assert list(df['GLOBAL_POSITION_INT.relative_alt_m']) == [1.5]
+        assert list(df['GLOBAL_POSITION_INT.hdg_deg']) == [180.0]
+
+    def test_battery_status(self):
+        table = table_types.Table.create_table('BATTERY_STATUS')
+        for timestamp, voltages in [(1.0, [15800] + [65535] * 9), (2.0, [15750, 4000] + [65535] * 8),
+                                    (3.0, [65535] * 10)]:
+            table.append({'timestamp': timestamp, 'BATTERY_STATUS.current_battery': 120,
+                          'BATTERY_STATUS.voltages': voltages, 'BATTERY_STATUS.voltages_ext': [0, 0, 0, 0]})
+        df = table.get_dataframe(False)
+
+        # The voltage of the first battery, 65535 means the cell is not used and is passed through as-is
+        assert list(df.columns) == ['timestamp', 'BATTERY_STATUS.current_battery', 'BATTERY_STATUS.voltage']
+        assert list(df['BATTERY_STATUS.voltage']) == [15800, 15750, 65535]
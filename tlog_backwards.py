@@ -12,19 +12,16 @@ from segment_reader import add_segment_args, choose_reader_list
 
 
 def check_timestamps(reader):
-    count = 0
     prev_timestamp = None
 
-    for msg in reader:
-        sysid = msg.get_srcSystem()
-        compid = msg.get_srcComponent()
-        timestamp = getattr(msg, '_timestamp', 0.0)
+    for count, msg in enumerate(reader):
+        timestamp = msg._timestamp
 
-        if prev_timestamp is not None:
-            if timestamp < prev_timestamp:
-                print(f'Time goes backwards: count={count}, sysid={sysid}, compid={compid}, {prev_timestamp} to {timestamp}')
+        # Only look up the source if time goes backwards, which is rare
+        if prev_timestamp is not None and timestamp < prev_timestamp:
+            print(f'Time goes backwards: count={count}, sysid={msg.get_srcSystem()}, compid={msg.get_srcComponent()}, '
+                  f'{prev_timestamp} to {timestamp}')
 
-        count += 1
         prev_timestamp = timestamp
 
 
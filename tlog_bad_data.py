@@ -4,12 +4,18 @@
 Read MAVLink messages from a tlog file (telemetry log) and report on BAD_DATA messages.
 """
 
+import struct
 from argparse import ArgumentParser
+from collections import Counter
 
 from pymavlink import mavutil
 
 import util
 
+# Header fields after the magic marker, see BadDataInfo
+MAVLINK1_HEADER = struct.Struct('<xxxBBB')      # sysid, compid, msgid
+MAVLINK2_HEADER = struct.Struct('<xxxxxBBHB')   # sysid, compid, msgid 0:15, msgid 16:23
+
 
 class BadDataInfo:
     """
@@ -43,20 +49,17 @@ class BadDataInfo:
         self.reason = msg.reason
 
         # Is this a CRC error?
-        self.crc_error = True if msg.reason.find('invalid MAVLink CRC') >= 0 else False
+        self.crc_error = 'invalid MAVLink CRC' in msg.reason
 
-        # Parse the MAVLink header
-        b = bytes(msg.data)
-        self.mavlink2 = True if b[0] == 0xFD else False
+        # Parse the MAVLink header in place, without copying the data
+        data = msg.data
+        self.mavlink2 = data[0] == 0xFD
 
         if self.mavlink2:
-            self.sysid = int(b[5])
-            self.compid = int(b[6])
-            self.msg_id = (b[9] << 16) + (b[8] << 8) + b[7]
+            self.sysid, self.compid, msg_id_low, msg_id_high = MAVLINK2_HEADER.unpack_from(data)
+            self.msg_id = (msg_id_high << 16) + msg_id_low
         else:
-            self.sysid = int(b[3])
-            self.compid = int(b[4])
-            self.msg_id = int(b[5])
+            self.sysid, self.compid, self.msg_id = MAVLINK1_HEADER.unpack_from(data)
 
     def __str__(self):
         return f'BadDataMsg mavlink2={self.mavlink2} sysid={self.sysid} compid={self.compid} msg_id={self.msg_id} reason: {self.reason}'
@@ -74,11 +77,12 @@ class BadDataFinder:
 
         total_count = 0
         crc_errors = 0
-        counts = {}
+        counts = Counter()
+        recv_match = mlog.recv_match
         while True:
             try:
                 # It appears that I can't filter for BAD_DATA messages, so get them all
-                msg = mlog.recv_match(blocking=False)
+                msg = recv_match(blocking=False)
             except Exception as e:
                 print(f'CRASH WITH ERROR "{e}" READING {self.infile}')
                 return
@@ -95,14 +99,11 @@ class BadDataFinder:
                 crc_errors = crc_errors + (1 if msg_info.crc_error else 0)
 
                 # Count by underlying message type
-                if msg_info.msg_id not in counts:
-                    counts[msg_info.msg_id] = 0
-
                 counts[msg_info.msg_id] += 1
 
                 # Verbose!
                 if self.verbose:
-                    print(BadDataInfo(msg))
+                    print(msg_info)
 
         for msg_id_item in sorted(counts.items()):
             print(f'msg_id {msg_id_item[0]} count {msg_id_item[1]}')
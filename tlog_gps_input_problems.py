@@ -8,30 +8,21 @@ Supports segments.
 
 from argparse import ArgumentParser
 
+import numpy as np
+
+import util
 from segment_reader import add_segment_args, choose_reader_list
 
 
 def check_gps_input_messages(reader):
-    num_bad_fix = 0
-    num_no_sat = 0
-    num_bad = 0
-    num_good = 0
-
-    for msg in reader:
-        good = True
-
-        if msg.fix_type == 0:
-            good = False
-            num_bad_fix += 1
-
-        if msg.satellites_visible == 0:
-            good = False
-            num_no_sat += 1
-
-        if good:
-            num_good += 1
-        else:
-            num_bad += 1
+    # Read the fields we check, then count problems with vectorized numpy ops
+    fields = util.read_fields(reader, {'fix_type': 'B', 'satellites_visible': 'B'})
+    bad_fix = fields['fix_type'] == 0
+    no_sat = fields['satellites_visible'] == 0
+    num_bad_fix = int(np.count_nonzero(bad_fix))
+    num_no_sat = int(np.count_nonzero(no_sat))
+    num_bad = int(np.count_nonzero(bad_fix | no_sat))
+    num_good = len(bad_fix) - num_bad
 
     print(f'{num_bad_fix} bad fix, {num_no_sat} no satellites, {num_bad} bad, {num_good} good')
 
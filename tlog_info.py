@@ -7,7 +7,10 @@ Supports segments.
 """
 
 import argparse
+import sys
+from collections import Counter, defaultdict
 
+import numpy as np
 import pymavlink.dialects.v20.ardupilotmega as apm
 
 import table_types
@@ -15,8 +18,15 @@ from segment_reader import add_segment_args, choose_reader_list
 
 MSG_TYPES = ['HEARTBEAT', 'STATUSTEXT', 'SYSTEM_TIME', 'SYS_STATUS']
 
+# The MAV_SYS_STATUS_SENSOR enum is static, build the (bit, entry) list once
+SENSOR_ITEMS = [(bit, entry) for bit, entry in apm.enums['MAV_SYS_STATUS_SENSOR'].items()
+                if bit != apm.MAV_SYS_STATUS_SENSOR_ENUM_END]
+SENSOR_BITS = np.array([bit for bit, _ in SENSOR_ITEMS], dtype=np.int64)
+
 
 class SensorInfo:
+    __slots__ = ('description', 'present', 'enabled', 'healthy')
+
     def __init__(self, description: str):
         if description == '0x100 laser based position':
             description = '0x100 laser based position (down-facing sonar rangefinder)'
@@ -26,13 +36,6 @@ class SensorInfo:
         self.enabled = 0
         self.healthy = 0
 
-    def count(self, enabled, healthy):
-        self.present += 1
-        if enabled:
-            self.enabled += 1
-        if healthy:
-            self.healthy += 1
-
     def count_str(self, count: int) -> str:
         if count == 0:
             return 'NEVER!'
@@ -46,6 +49,9 @@ class SensorInfo:
 
 
 class CompInfo:
+    __slots__ = ('_sys_id', '_comp_id', '_heartbeat_count', '_mode_counter', '_status_severities', '_status_strings',
+                 '_unix_time', '_sys_status_masks', '_handlers')
+
     def __init__(self, sys_id: int, comp_id: int):
         self._sys_id = sys_id
         self._comp_id = comp_id
@@ -57,56 +63,77 @@ class CompInfo:
         self._mode_counter = table_types.ModeCounter()
 
         # Count # of unique STATUSTEXT.severity and .text values
-        self._status_severities = {}
-        self._status_strings = {}
+        self._status_severities = Counter()
+        self._status_strings = Counter()
 
         # Count # of non-zero SYSTEM_TIME.time_unix_usec values
         self._unix_time = 0
 
         # Keep stats on sensor health
-        self._sensors_present: dict[int, SensorInfo] | None = None
+        # The SYS_STATUS sensor bitmasks rarely change, so count each (present, enabled, health) combination and
+        # decode the bits at report time
+        self._sys_status_masks = Counter()
+
+        # Handlers for the message types in MSG_TYPES
+        self._handlers = {
+            'HEARTBEAT': self.process_heartbeat,
+            'STATUSTEXT': self.process_statustext,
+            'SYSTEM_TIME': self.process_system_time,
+            'SYS_STATUS': self.process_sys_status,
+        }
 
     def process_msg(self, msg):
-        msg_type = msg.get_type()
-        data = msg.to_dict()
-
-        if msg_type == 'HEARTBEAT':
-
-            self._heartbeat_count += 1
-            self._mode_counter.count(data)
-
-        elif msg_type == 'STATUSTEXT':
-
-            severity = data['severity']
-            if severity not in self._status_severities:
-                self._status_severities[severity] = 0
-            self._status_severities[severity] += 1
-
-            string = data['text']
-            if string not in self._status_strings:
-                self._status_strings[string] = 0
-            self._status_strings[string] += 1
-
-        elif msg_type == 'SYSTEM_TIME':
-
-            if data['time_unix_usec'] != 0:
-                self._unix_time += 1
-
-        elif msg_type == 'SYS_STATUS':
-
-            if self._sensors_present is None:
-                self._sensors_present = {}
-
-            for bit, entry in apm.enums['MAV_SYS_STATUS_SENSOR'].items():
-                if bit == apm.MAV_SYS_STATUS_SENSOR_ENUM_END:
-                    break
-                if msg.onboard_control_sensors_present & bit:
-                    if bit not in self._sensors_present:
-                        self._sensors_present[bit] = SensorInfo(entry.description)
-
-                    enabled = msg.onboard_control_sensors_enabled & bit
-                    healthy = msg.onboard_control_sensors_health & bit
-                    self._sensors_present[bit].count(enabled, healthy)
+        handler = self._handlers.get(msg.get_type())
+        if handler is not None:
+            handler(msg)
+
+    def process_heartbeat(self, msg):
+        self._heartbeat_count += 1
+        self._mode_counter.count(msg)
+
+    def process_statustext(self, msg):
+        self._status_severities[msg.severity] += 1
+        # The same few strings tend to repeat, intern them so the Counter lookups are cheap
+        self._status_strings[sys.intern(msg.text)] += 1
+
+    def process_system_time(self, msg):
+        if msg.time_unix_usec != 0:
+            self._unix_time += 1
+
+    def process_sys_status(self, msg):
+        self._sys_status_masks[(msg.onboard_control_sensors_present,
+                                msg.onboard_control_sensors_enabled,
+                                msg.onboard_control_sensors_health)] += 1
+
+    def get_sensors_present(self) -> dict[int, SensorInfo]:
+        if not self._sys_status_masks:
+            return {}
+
+        # One row per (present, enabled, health) combination, one column per sensor bit
+        masks = np.array(list(self._sys_status_masks.keys()), dtype=np.int64)
+        counts = np.fromiter(self._sys_status_masks.values(), dtype=np.int64, count=len(self._sys_status_masks))
+        present = (masks[:, 0, None] & SENSOR_BITS) != 0
+        enabled = present & ((masks[:, 1, None] & SENSOR_BITS) != 0)
+        healthy = present & ((masks[:, 2, None] & SENSOR_BITS) != 0)
+
+        present_counts = counts @ present
+        enabled_counts = counts @ enabled
+        healthy_counts = counts @ healthy
+
+        # Report sensors in the order they first appeared
+        columns = np.flatnonzero(present.any(axis=0))
+        first_rows = present.argmax(axis=0)[columns]
+
+        sensors_present = {}
+        for i in columns[np.argsort(first_rows, kind='stable')]:
+            bit, entry = SENSOR_ITEMS[i]
+            info = SensorInfo(entry.description)
+            info.present = int(present_counts[i])
+            info.enabled = int(enabled_counts[i])
+            info.healthy = int(healthy_counts[i])
+            sensors_present[bit] = info
+
+        return sensors_present
 
     def report_heartbeat(self):
         print('            HEARTBEAT')
@@ -144,10 +171,10 @@ class CompInfo:
             print(f'                         valid time was sent {self._unix_time} time(s)')
 
     def report_sys_status(self):
-        if self._sensors_present is not None:
+        if len(self._sys_status_masks) > 0:
             print('            SYS_STATUS')
             print('                sensors')
-            for _, info in self._sensors_present.items():
+            for _, info in self.get_sensors_present().items():
                 print('                         ' + info.report())
 
     def report(self):
@@ -166,20 +193,18 @@ class TelemetryLogInfo:
 
         # Build a dictionary sys_id => system
         # Each system is a dictionary of comp_id => instance of CompInfo
-        systems = {}
+        systems = defaultdict(dict)
         for msg in self.reader:
             sys_id = msg.get_srcSystem()
-
-            if sys_id not in systems:
-                systems[sys_id] = {}
-
             comp_id = msg.get_srcComponent()
 
-            if comp_id not in systems[sys_id]:
-                systems[sys_id][comp_id] = CompInfo(sys_id, comp_id)
+            comps = systems[sys_id]
+            comp_info = comps.get(comp_id)
+            if comp_info is None:
+                comp_info = comps[comp_id] = CompInfo(sys_id, comp_id)
 
             # Scan records for interesting info
-            systems[sys_id][comp_id].process_msg(msg)
+            comp_info.process_msg(msg)
 
         # Print results
         for si in sorted(systems.items()):
@@ -23,24 +23,41 @@ GPS_MSG_TYPES = ['GPS_INPUT', 'GPS_RAW_INT', 'GLOBAL_POSITION_INT']
 GPS_MSG_COLORS = ['#999999', '#777777', '#0000AA']
 
 
+# The map only needs lat and lon, plus the fields that GPSTable uses to drop bad rows
+MAP_FIELDS = ['lat', 'lon', 'fix_type', 'hdop', 'eph']
+
+
 def build_map_from_tlog(reader, outfile, verbose, center, zoom, hdop_max):
     tables: dict[str, table_types.Table] = {}
 
+    # msg_type => (table, [(key, field), ...]), the keys are built once per type
+    dispatch = {}
+
     for msg in reader:
         msg_type = msg.get_type()
-        raw_data = msg.to_dict()
-        timestamp = getattr(msg, '_timestamp', 0.0)
-
-        # Clean up the data: add the timestamp, remove mavpackettype, and rename the keys
-        clean_data = {'timestamp': timestamp}
-        for key in raw_data.keys():
-            if key != 'mavpackettype':
-                clean_data[f'{msg_type}.{key}'] = raw_data[key]
-
-        if msg_type not in tables:
-            tables[msg_type] = table_types.Table.create_table(msg_type, hdop_max=hdop_max, filter_bad=True)
-
-        tables[msg_type].append(clean_data)
+        entry = dispatch.get(msg_type)
+
+        if entry is None:
+            if msg_type not in GPS_MSG_TYPES:
+                # Only GPS_MSG_TYPES are drawn, don't bother saving anything else
+                dispatch[msg_type] = entry = (None, [])
+            else:
+                table = table_types.Table.create_table(msg_type, hdop_max=hdop_max, filter_bad=True)
+                fieldnames = msg.get_fieldnames()
+                keys = [(table.field_key(field), field) for field in MAP_FIELDS if field in fieldnames]
+                tables[msg_type] = table
+                dispatch[msg_type] = entry = (table, keys)
+
+        table, keys = entry
+        if table is None:
+            continue
+
+        # Read just the fields we need, skip to_dict()
+        row = {'timestamp': msg._timestamp}
+        for key, field in keys:
+            row[key] = getattr(msg, field)
+
+        table.append(row)
 
     mm = MapMaker(verbose, center, zoom)
 
@@ -29,6 +29,7 @@ import os
 os.environ['MAVLINK20'] = '1'
 
 import argparse
+import sys
 
 import table_types
 from log_merger import LogMerger
@@ -121,15 +122,28 @@ class TelemetryLogReader(LogMerger):
     def read_tlog(self):
         self.tables = {}
 
+        # Look these up once, not once per message
+        tables = self.tables
+
+        # (msg_type, sysid, compid) => (table_name, sysid key, compid key), built the first time a source is seen
+        sources = {}
+
+        # table_name => (append, [(key, field), ...]), built when the table is created
+        table_info = {}
+        filter_sysid = self.sysid
+        filter_compid = self.compid
+        max_msgs = self.max_msgs
+        verbose = self.verbose
+
         msg_count = 0
         for msg in self.reader:
             sysid = msg.get_srcSystem()
             compid = msg.get_srcComponent()
 
             # Filter by sysid and compid
-            if self.sysid > 0 and self.sysid != sysid:
+            if filter_sysid > 0 and filter_sysid != sysid:
                 continue
-            if self.compid > 0 and self.compid != compid:
+            if filter_compid > 0 and filter_compid != compid:
                 continue
 
             msg_type = msg.get_type()
@@ -143,9 +157,7 @@ class TelemetryLogReader(LogMerger):
                 if msg_type == 'HEARTBEAT' and compid != 1:
                     continue
 
-            raw_data = msg.to_dict()
-
-            qgc_s = getattr(msg, '_timestamp', 0.0)
+            qgc_s = msg._timestamp
 
             if self.system_time:
                 # Merge on time_boot_ms (time since ArduSub boot in ms) instead of QGroundControl (system time in s).
@@ -154,7 +166,7 @@ class TelemetryLogReader(LogMerger):
                 # TODO watch for resets (ArduSub reboots)
 
                 if msg_type == 'SYSTEM_TIME' and sysid == 1 and compid == 1 and self.time_delta_s is None:
-                    self.time_delta_s = qgc_s - raw_data['time_boot_ms'] / 1000.0
+                    self.time_delta_s = qgc_s - msg.time_boot_ms / 1000.0
                     print(f'Time synchronized, delta is {self.time_delta_s} seconds')
 
                 if self.time_delta_s is None:
@@ -165,31 +177,41 @@ class TelemetryLogReader(LogMerger):
                 clean_data = {'timestamp': qgc_s}
 
             # Save sysid and compid in the table name or in the data
-            if self.split_source:
-                table_name = f'{msg_type}_{sysid}_{compid}'
-            else:
-                table_name = msg_type
-                clean_data[f'{msg_type}.sysid'] = sysid
-                clean_data[f'{msg_type}.compid'] = compid
-
-            # Add a prefix to the existing keys
-            for key in raw_data.keys():
-                if key != 'mavpackettype':
-                    clean_data[f'{table_name}.{key}'] = raw_data[key]
-
-            # Make sure the table exists
-            if table_name not in self.tables:
-                self.tables[table_name] = table_types.Table.create_table(
+            source = sources.get((msg_type, sysid, compid))
+            if source is None:
+                if self.split_source:
+                    source = (f'{msg_type}_{sysid}_{compid}', None, None)
+                else:
+                    source = (msg_type, sys.intern(f'{msg_type}.sysid'), sys.intern(f'{msg_type}.compid'))
+                sources[(msg_type, sysid, compid)] = source
+
+            table_name, sysid_key, compid_key = source
+            if sysid_key is not None:
+                clean_data[sysid_key] = sysid
+                clean_data[compid_key] = compid
+
+            # Make sure the table exists, and keep its append method and prefixed keys handy
+            info = table_info.get(table_name)
+            if info is None:
+                table = table_types.Table.create_table(
                     msg_type, table_name=table_name, filter_bad=not self.raw, surftrak=self.surftrak)
+                tables[table_name] = table
+                info = table_info[table_name] = (table.append,
+                                                 [(table.field_key(field), field) for field in msg.get_fieldnames()])
+
+            # Copy the fields using the prefixed keys, this is much faster than msg.to_dict()
+            append, keys = info
+            for key, field in keys:
+                clean_data[key] = getattr(msg, field)
 
             # Append the message to the table
-            self.tables[table_name].append(clean_data)
+            append(clean_data)
 
             msg_count += 1
-            if msg_count > self.max_msgs:
+            if msg_count > max_msgs:
                 print(f'Too many messages, stopping')
                 break
-            if self.verbose and msg_count % 20000 == 0:
+            if verbose and msg_count % 20000 == 0:
                 print(f'{msg_count} messages')
 
         print(f'{msg_count} messages')
@@ -14,7 +14,9 @@ import util
 class Scanner:
     def __init__(self, filename: str, types: list[str] | None):
         self.filename = filename
-        self.types = types
+
+        # As in FileReader, a set makes the recv_match type check a hash lookup
+        self.types = None if types is None else set(types)
 
     def read(self):
         mlog = mavutil.mavlink_connection(self.filename, dialect='ardupilotmega')
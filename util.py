@@ -1,6 +1,9 @@
 import datetime
 import glob
 import os
+from array import array
+
+import numpy as np
 
 MAX_RATE = 100.0
 
@@ -17,78 +20,110 @@ def add_rate_field(messages: list[dict], half_n: int, max_gap: float, field_name
     """
     Calc message rate using the MAV timestamp (comes from QGC wall time) based on 2 * half_n intervals.
 
+    See calc_rates for details.
+    """
+    timestamps = np.fromiter((message['timestamp'] for message in messages), dtype=np.float64, count=len(messages))
+    rates = calc_rates(timestamps, half_n, max_gap, field_name)
+    if rates is not None:
+        for message, rate in zip(messages, rates.tolist()):
+            message[field_name] = rate
+
+
+def calc_rates(timestamps, half_n: int, max_gap: float, field_name: str) -> np.ndarray | None:
+    """
+    Calc message rate using the MAV timestamp (comes from QGC wall time) based on 2 * half_n intervals.
+
     If there is a long gap in the timestamps then split the list into 2 segments and mark the gap by setting the rate
     to 0.0 on the messages just before and just after the gap. This will make the gap obvious in a log viewer.
 
     Note that messages might be coming from multiple components, e.g., DISTANCE_SENSOR from autopilot and BlueOS.
     Re-run with compid=x to isolate each source component.
 
-    This is a linear but tricky algorithm. See the tests for example output.
+    Return an array of rates, one per timestamp, or None if there are too few timestamps.
+
+    The window for message i is [i - half_n, i + half_n], clipped to the segment that holds i. All windows are computed
+    at once with numpy. See the tests for example output.
     """
 
-    if len(messages) < 2 * half_n + 1:
-        return
+    ts = np.asarray(timestamps, dtype=np.float64)
+    n = len(ts)
+    if n < 2 * half_n + 1:
+        return None
+
+    # Find the gaps, gaps[k] is the index of the message just before gap k
+    intervals = np.diff(ts)
+    gaps = np.flatnonzero(intervals > max_gap)
+    for j in gaps:
+        print(f'NOTE: {intervals[j] :.2f}s gap detected at ts {ts[j] :.2f} while generating {field_name}')
+    total_gaps = intervals[gaps].sum()
+
+    # Find the first and last message in the segment that holds each message
+    segment = np.zeros(n, dtype=np.intp)
+    segment[gaps + 1] = 1
+    segment = np.cumsum(segment)
+    segment_first = np.concatenate(([0], gaps + 1))[segment]
+    segment_last = np.concatenate((gaps, [n - 1]))[segment]
+
+    # Note left and right edge of each window
+    i = np.arange(n)
+    wl = np.maximum(segment_first, i - half_n)
+    wr = np.minimum(segment_last, i + half_n)
+    numerator = wr - wl
+    denominator = ts[wr] - ts[wl]
+
+    # Set the rate to 0.0 on either side of each gap. The last message should also have rate=0.0. This will be easy to
+    # spot in plotjuggler.
+    zero = np.zeros(n, dtype=bool)
+    zero[gaps] = True
+    zero[gaps + 1] = True
+    zero[-1] = True
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = numerator / denominator
+
+    # Avoid edge cases: divide by 0; very high rates; time going backwards
+    # This might happen if timestamps repeat or are very close to each other
+    too_close = ~zero & (denominator < 0.01)
+    too_high = ~zero & ~too_close & (rates > MAX_RATE)
+    for j in np.flatnonzero(too_close):
+        print(f'{denominator[j]} < 0.01 computing {field_name}[{j}].rate, clip to {MAX_RATE}')
+    for j in np.flatnonzero(too_high):
+        print(f'{field_name}[{j}].rate > {MAX_RATE}, clip to {MAX_RATE}')
+    rates[too_close | too_high] = MAX_RATE
+    rates[zero] = 0.0
+
+    total_time = ts[-1] - ts[0]
+    without_gaps = total_time - total_gaps
+    print(f'{field_name} summary: {n} messages in {total_time :.2f} seconds for '
+          f'{n / total_time :.2f} mps, without gaps {n / without_gaps :.2f} mps')
 
-    def is_gap_right(j: int):
-        return j + 1 < len(messages) and messages[j + 1]['timestamp'] - messages[j]['timestamp'] > max_gap
+    return rates
 
-    total_gaps = 0
 
-    # Note left and right edge of window
-    wl = i = wr = 0
-    while wr < len(messages) and wr < half_n and not is_gap_right(wr):
-        wr += 1
+def iter_rows(df):
+    """
+    Iterate over the rows of a DataFrame, yielding one dict per row.
 
-    while i < len(messages) - 1:
-        # Expand window on the right
-        if wr < len(messages) and not is_gap_right(wr - 1):
-            wr += 1
+    This is much faster than df.iterrows(), which builds a Series for every row.
+    """
+    columns = list(df.columns)
+    for values in zip(*(df[column].tolist() for column in columns)):
+        yield dict(zip(columns, values))
 
-        ts_i = messages[i]['timestamp']
 
-        if is_gap_right(i):
-            gap_len = messages[i + 1]['timestamp'] - ts_i
-            total_gaps += gap_len
-            print(f'NOTE: {gap_len :.2f}s gap detected at ts {ts_i :.2f} while generating {field_name}')
+def read_fields(messages, fields: dict[str, str]) -> dict[str, np.ndarray]:
+    """
+    Read the named fields from every message in a single pass, returning one numpy array per field.
 
-            # Set the rate to 0.0 on either side of the segment
-            messages[i][field_name] = 0.0
-            i += 1
-            messages[i][field_name] = 0.0
+    fields maps a field name to an array typecode, e.g., {'fix_type': 'B', '_timestamp': 'd'}.
+    """
+    columns = {field: array(typecode) for field, typecode in fields.items()}
+    items = list(columns.items())
+    for msg in messages:
+        for field, column in items:
+            column.append(getattr(msg, field))
 
-            # Reset the window
-            wl = i
-            wr = i + 1 if i < len(messages) else i
-            while wr < len(messages) and wr - wl - 1 < half_n and not is_gap_right(wr):
-                wr += 1
-        else:
-            numerator = wr - wl - 1
-            denominator = messages[wr - 1]['timestamp'] - messages[wl]['timestamp']
-
-            # Avoid edge cases: divide by 0; very high rates; time going backwards
-            # This might happen if timestamps repeat or are very close to each other
-            if denominator < 0.01:
-                print(f'{denominator} < 0.01 computing {field_name}[{i}].rate, clip to {MAX_RATE}')
-                messages[i][field_name] = MAX_RATE
-            elif numerator / denominator > MAX_RATE:
-                print(f'{field_name}[{i}].rate > {MAX_RATE}, clip to {MAX_RATE}')
-                messages[i][field_name] = MAX_RATE
-            else:
-                messages[i][field_name] = numerator / denominator
-
-            # Shrink window on the left
-            if i - wl >= half_n:
-                wl += 1
-
-        i += 1
-
-    # Last message should have rate=0.0. This will be easy to spot in plotjuggler.
-    messages[-1][field_name] = 0.0
-
-    total_time = messages[-1]['timestamp'] - messages[0]['timestamp']
-    without_gaps = total_time - total_gaps
-    print(f'{field_name} summary: {len(messages)} messages in {total_time :.2f} seconds for '
-          f'{len(messages) / total_time :.2f} mps, without gaps {len(messages) / without_gaps :.2f} mps')
+    return {field: np.frombuffer(column, dtype=column.typecode) for field, column in items}
 
 
 def expand_path(paths: list[str], recurse: bool, ext: str | list[str]) -> list[str]: